@@ -1,4 +1,10 @@
+import asyncio
+
 from mcstatus import MinecraftServer
+from mcstatus.pinger import AsyncServerPinger
+from mcstatus.protocol.connection import TCPAsyncSocketConnection
+
+MAX_CONCURRENT = 200
 
 file = open('servers.txt', 'r')
 count = 0
@@ -11,13 +17,32 @@ while True:
         break
     ips.append(line.strip())
 
-for ip in ips:
-    try:
-        server = MinecraftServer.lookup(ip)
-        status = server.status()
-        print(ip)
-        print("Players online:", status.players.online)
-        print("Version:", status.version.name)
-        print('')
-    except:
-        pass
\ No newline at end of file
+async def query_info(ip, semaphore):
+    async with semaphore:
+        try:
+            server = MinecraftServer.lookup(ip)
+            # async_status() never closes its socket, so run the status
+            # exchange here and close it once the response is read
+            connection = TCPAsyncSocketConnection()
+            await connection.connect((server.host, server.port))
+            try:
+                pinger = AsyncServerPinger(connection, host=server.host, port=server.port)
+                pinger.handshake()
+                return await pinger.read_status()
+            finally:
+                connection.close()
+        except Exception:
+            return None
+
+async def main():
+    # Query saved servers concurrently, but cap how many sockets are open at once
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+    return await asyncio.gather(*(query_info(ip, semaphore) for ip in ips))
+
+for ip, status in zip(ips, asyncio.run(main())):
+    if status is None:
+        continue
+    print(ip)
+    print("Players online:", status.players.online)
+    print("Version:", status.version.name)
+    print('')
@@ -1,31 +1,204 @@
-from mcstatus import MinecraftServer
-import concurrent.futures
+import asyncio
+import collections
+import json
+import os
 import random
-import time
 
-def random_address():
-	address = ".".join(map(str, (random.randint(0, 255) for _ in range(4)))) + ':25565'
-	return address
+try:
+	# Optional; a faster drop-in event loop on Linux and macOS
+	from uvloop import run
+except ImportError:
+	from asyncio import run
 
-def query_address(address):
+try:
+	import resource
+except ImportError:
+	# Not available on Windows
+	resource = None
+
+PORT = 25565
+PROTOCOL_VERSION = 47
+CONNECT_TIMEOUT = 0.5
+TIMEOUT = 1.0
+BATCH_SIZE = 10000
+MAX_CONCURRENT = 2000
+# Descriptors kept free for stdio, servers.txt and the event loop itself
+FD_HEADROOM = 256
+REPORT_INTERVAL = 5
+# Set SCAN_DEBUG=1 to also print every failed probe
+DEBUG = os.environ.get('SCAN_DEBUG', '') not in ('', '0')
+
+# Kept open for the whole run; line buffering flushes each hit as it's found
+servers_file = open('servers.txt', 'a', buffering=1)
+
+# Servers tend to sit next to each other, so after a hit the rest of its /24
+# is probed ahead of the random queue, once per /24
+neighbours = collections.deque()
+scanned_subnets = set()
+
+# Running totals for the periodic progress line
+counts = {'scanned': 0, 'found': 0}
+
+# Set when main() exits so the workers stop even if their cancellation was
+# lost (before Python 3.12, wait_for() can turn a cancel that races a failed
+# probe into that probe's exception, which query_address() then swallows)
+stopping = False
+
+# Kind of address space behind each first octet: 0 = reserved outright,
+# 1 = public, 2 = public apart from the ranges checked in is_reserved()
+RESERVED, PUBLIC, MIXED = 0, 1, 2
+FIRST_OCTETS = bytes(
+	RESERVED if a in (0, 10, 127) or a >= 224 else
+	MIXED if a in (100, 169, 172, 192, 198, 203) else
+	PUBLIC
+	for a in range(256)
+)
+
+def is_reserved(a, b, c):
+	if a == 100:
+		return 64 <= b <= 127
+	if a == 169:
+		return b == 254
+	if a == 172:
+		return 16 <= b <= 31
+	if a == 192:
+		return b == 168 or (b == 0 and c in (0, 2)) or (b == 88 and c == 99)
+	if a == 198:
+		return b in (18, 19) or (b == 51 and c == 100)
+	return a == 203 and b == 0 and c == 113
+
+def random_addresses(count):
+	# Draw the random bits for the whole batch at once, dropping any reserved picks
+	data = random.getrandbits(32 * count).to_bytes(4 * count, 'big')
+	addresses = []
+	for a, b, c, d in zip(*[iter(data)] * 4):
+		kind = FIRST_OCTETS[a]
+		if kind == PUBLIC or (kind == MIXED and not is_reserved(a, b, c)):
+			addresses.append('%d.%d.%d.%d' % (a, b, c, d))
+	return addresses
+
+def varint(value):
+	data = b''
+	while True:
+		byte = value & 0x7F
+		value >>= 7
+		if value:
+			data += bytes([byte | 0x80])
+		else:
+			return data + bytes([byte])
+
+async def read_varint(reader):
+	value = 0
+	for i in range(5):
+		byte = (await reader.readexactly(1))[0]
+		value |= (byte & 0x7F) << (7 * i)
+		if not byte & 0x80:
+			return value
+	raise ValueError('VarInt is too big')
+
+# Only the host string changes between probes, so the rest of the
+# handshake is encoded once up front
+HANDSHAKE_PREFIX = b'\x00' + varint(PROTOCOL_VERSION)
+HANDSHAKE_SUFFIX = PORT.to_bytes(2, 'big') + b'\x01'
+STATUS_REQUEST = b'\x01\x00'
+
+def status_request(ip):
+	# Handshake (next state 1 = status) followed by an empty status request.
+	# A dotted quad keeps both lengths under 128, so each varint is one byte.
+	host = ip.encode()
+	handshake = HANDSHAKE_PREFIX + bytes((len(host),)) + host + HANDSHAKE_SUFFIX
+	return bytes((len(handshake),)) + handshake + STATUS_REQUEST
+
+async def query_status(ip):
+	# Nearly every random IP never completes the TCP connect, so drop those
+	# early and keep the rest of the deadline for hosts that actually answer
+	reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, PORT), timeout=CONNECT_TIMEOUT)
+	try:
+		writer.write(status_request(ip))
+		await read_varint(reader)
+		if await read_varint(reader) != 0x00:
+			raise ValueError('Unexpected packet id')
+		length = await read_varint(reader)
+		return json.loads(await reader.readexactly(length))
+	finally:
+		writer.close()
+
+async def query_address(ip):
+	address = ip + ':' + str(PORT)
 	try:
-		server = MinecraftServer.lookup(address)
-		status = server.status()
-		file = open('servers.txt', 'a')
-		file.write(address + '\n')
-		file.close()
-		print(address + ' ✅')
+		await asyncio.wait_for(query_status(ip), timeout=TIMEOUT)
 	except Exception as e:
-		print(address + ' ❌')
-		pass
-	print('')
-	return
+		counts['scanned'] += 1
+		if DEBUG:
+			print(address + ' ❌', repr(e))
+		return
+	counts['scanned'] += 1
+	counts['found'] += 1
+	servers_file.write(address + '\n')
+	print(address + ' ✅')
+	queue_neighbours(ip)
 
-print('Searching for open servers...')
-while True:
-	ip_addresses = []
-	for i in range(250):
-		ip_addresses.append(random_address())
+def queue_neighbours(ip):
+	subnet, _, last = ip.rpartition('.')
+	if subnet in scanned_subnets:
+		return
+	scanned_subnets.add(subnet)
+	neighbours.extend(subnet + '.' + str(d) for d in range(1, 255) if str(d) != last)
+
+async def worker(queue):
+	while not stopping:
+		ip = neighbours.popleft() if neighbours else await queue.get()
+		try:
+			await query_address(ip)
+		except Exception as e:
+			# Nothing awaits the workers, so an escaped error (e.g. a failed
+			# write to servers.txt) would silently shrink the pool for good
+			print('Error handling ' + ip + ':', repr(e))
+
+async def report_progress():
+	# Failures are no longer printed, so this is the only sign the scan is running
+	while True:
+		await asyncio.sleep(REPORT_INTERVAL)
+		print('Scanned %d addresses, found %d servers' % (counts['scanned'], counts['found']))
 
-	with concurrent.futures.ThreadPoolExecutor() as executor:
-		executor.map(query_address, ip_addresses)
\ No newline at end of file
+def raise_file_limit():
+	# Every in-flight probe holds a socket, and the common soft limit of 1024
+	# descriptors is below MAX_CONCURRENT, so raise it as far as allowed.
+	# Returns the soft limit now in effect, or None if there isn't one.
+	if resource is None:
+		return None
+	soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+	wanted = MAX_CONCURRENT + FD_HEADROOM
+	if hard != resource.RLIM_INFINITY:
+		wanted = min(wanted, hard)
+	if soft != resource.RLIM_INFINITY and soft < wanted:
+		try:
+			resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+			soft = wanted
+		except (ValueError, OSError):
+			pass
+	return None if soft == resource.RLIM_INFINITY else soft
+
+async def main(file_limit):
+	global stopping
+	# Never run more probes than there are descriptors to give them; past
+	# that point they would fail with EMFILE and look like dead hosts
+	concurrency = MAX_CONCURRENT
+	if file_limit is not None:
+		concurrency = max(1, min(MAX_CONCURRENT, file_limit - FD_HEADROOM))
+
+	# A fixed set of long-lived workers pulls from the queue, so a new probe
+	# starts as soon as any slot frees up instead of after each batch drains
+	queue = asyncio.Queue(maxsize=BATCH_SIZE)
+	workers = [asyncio.create_task(worker(queue)) for _ in range(concurrency)]
+	reporter = asyncio.create_task(report_progress())
+	try:
+		while True:
+			for ip in random_addresses(BATCH_SIZE):
+				await queue.put(ip)
+	finally:
+		stopping = True
+
+file_limit = raise_file_limit()
+print('Searching for open servers...')
+run(main(file_limit))